@@ -36,24 +36,30 @@ else:
     genai_client = genai.Client(http_options={"api_version": "v1alpha"})
 
 
+SYSTEM_INSTRUCTION = types.Content(
+    parts=[
+        types.Part(
+            text="""You are a helpful AI assistant designed to provide accurate and useful information."""
+        )
+    ]
+)
+
+# Everything except the tools is the same for every connection, so build the
+# config once and only swap in the tools per session.
+_LIVE_CONNECT_CONFIG_TEMPLATE = types.LiveConnectConfig(
+    response_modalities=[types.Modality.AUDIO],
+    tools=[],
+    # Change to desired language code (e.g., "es-ES" for Spanish, "fr-FR" for French)
+    speech_config=types.SpeechConfig(
+        voice_config=types.VoiceConfig(
+            prebuilt_voice_config=types.PrebuiltVoiceConfig(voice_name="Callirrhoe")
+        ),
+        language_code="cmn-CN",
+    ),
+    system_instruction=SYSTEM_INSTRUCTION,
+)
+
+
 def get_live_connect_config(tools) -> types.LiveConnectConfig:
     """Returns the configuration for the live connection."""
-    live_connect_config = types.LiveConnectConfig(
-        response_modalities=[types.Modality.AUDIO],
-        tools=tools,
-        # Change to desired language code (e.g., "es-ES" for Spanish, "fr-FR" for French)
-        speech_config=types.SpeechConfig(
-            voice_config=types.VoiceConfig(
-                prebuilt_voice_config=types.PrebuiltVoiceConfig(voice_name="Callirrhoe")
-            ),
-            language_code="cmn-CN",
-        ),
-        system_instruction=types.Content(
-            parts=[
-                types.Part(
-                    text="""You are a helpful AI assistant designed to provide accurate and useful information."""
-                )
-            ]
-        ),
-    )
-    return live_connect_config
+    return _LIVE_CONNECT_CONFIG_TEMPLATE.model_copy(update={"tools": tools})
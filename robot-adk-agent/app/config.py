@@ -1,8 +1,9 @@
 import os
+from typing import Any
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
-config = {
+config: dict[str, Any] = {
     "mcpServers": {
         "robot": {
             "command": "uv",
@@ -22,3 +23,20 @@ config = {
         },
     }
 }
+
+
+def build_user_config(session_key: str) -> dict[str, Any]:
+    """Return a copy of ``config`` whose robot server uses ``session_key``.
+
+    Only the robot server's env differs between users, so the rest of the
+    config is shared instead of deep-copied.
+    """
+    robot = config["mcpServers"]["robot"]
+    return {
+        "mcpServers": {
+            "robot": {
+                **robot,
+                "env": {**robot["env"], "SESSION_KEY": session_key},
+            }
+        }
+    }
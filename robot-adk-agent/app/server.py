@@ -14,12 +14,14 @@
 
 import asyncio
 import base64
-import copy
-import json
+import functools
 import logging
 import os
+import time
 from asyncio import Queue
-from collections.abc import Callable
+from collections.abc import AsyncIterator, Callable
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
 from datetime import datetime, timedelta
 from typing import Any, Optional
 from urllib.parse import unquote_plus
@@ -27,19 +29,32 @@ from zoneinfo import ZoneInfo
 
 import backoff
 import fastmcp
+import orjson
 from app.agent import MODEL_ID, genai_client, get_live_connect_config
-from app.config import config
-from cryptography.hazmat.backends import default_backend
-from cryptography.hazmat.primitives import padding
-from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+from app.config import build_user_config
+from Crypto.Cipher import AES as _AES
 from fastapi import FastAPI, WebSocket
 from fastapi.middleware.cors import CORSMiddleware
 from google.cloud import logging as google_cloud_logging
+from google.cloud.logging.handlers import CloudLoggingHandler
+from google.cloud.logging_v2.handlers.transports import BackgroundThreadTransport
 from google.genai import types
-from google.genai.types import LiveServerToolCall
 from websockets.exceptions import ConnectionClosedError
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    """Run the MCP client pool sweeper for the lifetime of the app."""
+    sweeper = asyncio.create_task(_evict_idle_mcp_clients())
+    try:
+        yield
+    finally:
+        sweeper.cancel()
+        await asyncio.gather(sweeper, return_exceptions=True)
+        await _close_mcp_pool()
+
+
+app = FastAPI(lifespan=lifespan)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -47,17 +62,119 @@ app.add_middleware(
     allow_headers=["*"],
 )
 logging_client = google_cloud_logging.Client()
-logger = logging_client.logger(__name__)
+# Structured events go to Cloud Logging through a background thread so the
+# HTTPS write never blocks the event loop.
+logger = logging.getLogger(__name__)
+logger.addHandler(
+    CloudLoggingHandler(
+        logging_client, name=__name__, transport=BackgroundThreadTransport
+    )
+)
+logger.propagate = False
 logging.basicConfig(level=logging.INFO)
 
 SESSION_AES_KEY = os.environ.get("SESSION_AES_KEY", "0123456789012345").encode()
 SESSION_AES_IV = os.environ.get("SESSION_AES_IV", "5432109876543210").encode()
 SKIP_TIME_CHECK = os.environ.get("SKIP_TIME_CHECK", "true").lower() == "true"
+# Coalesce Gemini frames that reach the client writer within this many
+# milliseconds into one length-prefixed binary message; 0 disables batching.
+WS_BATCH_MS = int(os.environ.get("WS_BATCH_MS", "0"))
+
+_HK_TZ = ZoneInfo("Asia/Hong_Kong")
+
+# CBC cipher objects are stateful, so bind the fixed key and IV once and
+# create a fresh decryptor per call from this factory.
+_new_session_cipher = functools.partial(
+    _AES.new, SESSION_AES_KEY, _AES.MODE_CBC, SESSION_AES_IV
+)
+_PKCS7_BLOCK_SIZE = _AES.block_size
+# Day zero of the Excel serial dates used in session keys
+_EXCEL_EPOCH = datetime(1899, 12, 30, tzinfo=_HK_TZ)
+
+# Cheap pre-filter so only frames that can carry a tool call get JSON-parsed.
+# Audio arrives as serverContent frames, which a server message never combines
+# with a toolCall. Only the opening brace, whitespace and the first key fit in
+# the first _FRAME_HEAD_SIZE bytes, so those frames are recognised there
+# instead of scanning the whole payload for the tool call marker.
+_SERVER_CONTENT_MARKER = b'"serverContent"'
+_FRAME_HEAD_SIZE = 24
+_TOOL_CALL_MARKER = b'"toolCall"'
+
+# Pending tool calls kept per session; the oldest is dropped beyond this
+_TOOL_CALL_QUEUE_SIZE = 64
+
+# Upper bound on the number of frames coalesced into one client message
+_BATCH_MAX_FRAMES = 100
+# Frames waiting for the client writer; reading from Gemini pauses beyond this
+_OUT_QUEUE_SIZE = 256
+# Seconds cleanup() waits for the writer to send frames already queued
+_WRITER_FLUSH_TIMEOUT = 1.0
+
+# The robot tool schema does not depend on the per-user SESSION_KEY, so the
+# result of list_tools() is shared across connections for this many seconds.
+_TOOL_CACHE_TTL = 60
+_tool_cache: tuple[float, list] | None = None
+
+# Connected MCP clients are kept per user between WebSocket connections so a
+# reconnect skips spawning the MCP server subprocess. Idle entries are closed
+# after _POOL_MAX_IDLE seconds, and the least recently used entry is closed
+# once more than _POOL_MAX_SIZE users have one.
+_POOL_MAX_IDLE = 300
+_POOL_MAX_SIZE = 16
+_POOL_SWEEP_INTERVAL = 60
+
+
+@dataclass(slots=True)
+class FunctionCall:
+    """A function call requested by Gemini, read straight from a toolCall frame."""
+
+    name: str
+    id: str | None
+    args: dict[str, Any]
+
+
+def _read_function_call(entry: Any) -> FunctionCall | None:
+    """Read one entry of a toolCall's functionCalls, or None if it is malformed."""
+    if not isinstance(entry, dict) or not isinstance(entry.get("name"), str):
+        return None
+    args = entry.get("args")
+    return FunctionCall(
+        name=entry["name"],
+        id=entry.get("id"),
+        args=args if isinstance(args, dict) else {},
+    )
+
+
+def _build_tool_error(
+    name: str, call_id: str | None, message: str
+) -> types.LiveClientToolResponse:
+    """Build the tool response reporting a failed function call to Gemini."""
+    return types.LiveClientToolResponse(
+        function_responses=[
+            types.FunctionResponse(name=name, id=call_id, response={"error": message})
+        ]
+    )
 
 
 class GeminiSession:
     """Manages bidirectional communication between a client and the Gemini model."""
 
+    __slots__ = (
+        "_gemini_reader_task",
+        "_is_running",
+        "_out_queue",
+        "_tool_call_queue",
+        "_tool_processor_task",
+        "_writer_task",
+        "end_time",
+        "mcp_client",
+        "run_id",
+        "session",
+        "start_time",
+        "user_id",
+        "websocket",
+    )
+
     def __init__(
         self,
         session: Any,
@@ -80,16 +197,33 @@ class GeminiSession:
         self.end_time = end_time
         self.run_id = "n/a"
         self.user_id = "n/a"
-        self._tool_tasks: list[asyncio.Task] = []
-        self._tool_call_queue: Queue = Queue()
+        self._tool_call_queue: Queue = Queue(maxsize=_TOOL_CALL_QUEUE_SIZE)
         self._tool_processor_task: asyncio.Task | None = None
         self._is_running = True
+        self._out_queue: Queue = Queue(maxsize=_OUT_QUEUE_SIZE)
+        self._writer_task: asyncio.Task | None = None
+        self._gemini_reader_task: asyncio.Task | None = None
 
     async def cleanup(self) -> None:
         """Clean up resources and tasks."""
         self._is_running = False
 
-        # Cancel the tool processor task
+        # Let the client writer send the frames already queued, then stop it
+        if self._writer_task and not self._writer_task.done():
+            flushed = asyncio.ensure_future(self._out_queue.join())
+            try:
+                await asyncio.wait(
+                    {flushed, self._writer_task}, timeout=_WRITER_FLUSH_TIMEOUT
+                )
+            finally:
+                flushed.cancel()
+                self._writer_task.cancel()
+            try:
+                await self._writer_task
+            except asyncio.CancelledError:
+                pass
+
+        # Cancel the tool processor along with any tool call it is awaiting
         if self._tool_processor_task and not self._tool_processor_task.done():
             self._tool_processor_task.cancel()
             try:
@@ -97,15 +231,18 @@ class GeminiSession:
             except asyncio.CancelledError:
                 pass
 
-        # Cancel any remaining tool tasks
-        for task in self._tool_tasks:
-            if not task.done():
-                task.cancel()
+    async def _forward_to_gemini(self, raw: str) -> None:
+        """Forward a realtime or content frame to Gemini untouched."""
+        await self.session._ws.send(raw)
 
-        if self._tool_tasks:
-            await asyncio.gather(*self._tool_tasks, return_exceptions=True)
-
-        self._tool_tasks.clear()
+    async def _handle_setup(self, raw: str) -> None:
+        """Record the run and user IDs from a setup frame and log it."""
+        setup = orjson.loads(raw)["setup"]
+        self.run_id = setup["run_id"]
+        self.user_id = setup["user_id"]
+        # The parsed frame is not used elsewhere, so tag it in place
+        setup["type"] = "setup"
+        logger.info("setup", extra={"json_fields": setup})
 
     async def receive_from_client(self) -> None:
         """Listen for and process messages from the client.
@@ -116,29 +253,23 @@ class GeminiSession:
         try:
             while self._is_running:
                 try:
-                    data = await self.websocket.receive_json()
+                    raw = await self.websocket.receive_text()
 
                     # Check session validity based on time
-                    current_time = datetime.now(ZoneInfo("Asia/Hong_Kong"))
+                    current_time = datetime.now(_HK_TZ)
                     if not (self.start_time < current_time < self.end_time):
                         logging.info(
                             f"Session for user {self.user_id} is not valid at {current_time}, closing connection."
                         )
                         break
 
-                    if isinstance(data, dict) and (
-                        "realtimeInput" in data or "clientContent" in data
-                    ):
-                        await self.session._ws.send(json.dumps(data))
-                    elif "setup" in data:
-                        self.run_id = data["setup"]["run_id"]
-                        self.user_id = data["setup"]["user_id"]
-                        logger.log_struct(
-                            {**data["setup"], "type": "setup"}, severity="INFO"
-                        )
+                    for marker, handler in _CLIENT_FRAME_ROUTES:
+                        if marker in raw:
+                            await handler(self, raw)
+                            break
                     else:
                         logging.warning(
-                            f"Received unexpected input from client: {data}"
+                            "Received unexpected input from client: %s", raw
                         )
                 except ConnectionClosedError as e:
                     logging.warning(f"Client {self.user_id} closed connection: {e}")
@@ -149,100 +280,333 @@ class GeminiSession:
         finally:
             await self.cleanup()
 
+    async def _call_single(self, fc: FunctionCall) -> types.LiveClientToolResponse:
+        """Call one MCP tool and build the response to send back to Gemini."""
+        try:
+            logging.debug(
+                "[%s] Calling tool function: %s with args: %s",
+                self.user_id,
+                fc.name,
+                fc.args,
+            )
+
+            response = await self.mcp_client.call_tool(fc.name, fc.args)
+
+            tool_response = types.LiveClientToolResponse(
+                function_responses=[
+                    types.FunctionResponse(
+                        name=fc.name,
+                        id=fc.id,
+                        response={"response": response[0].text},
+                    )
+                ]
+            )
+            logging.debug("[%s] Tool response: %s", self.user_id, tool_response)
+            return tool_response
+        except Exception as e:
+            logging.error(
+                "[%s] Error handling tool call %s: %s", self.user_id, fc.name, e
+            )
+            # Report the error back to Gemini
+            return _build_tool_error(fc.name, fc.id, f"Tool execution failed: {e!s}")
+
     async def _handle_tool_call(
-        self, session: Any, tool_call: LiveServerToolCall
+        self, session: Any, function_calls: list[FunctionCall]
     ) -> None:
-        """Process tool calls from Gemini and send back responses."""
-        if tool_call.function_calls is None:
+        """Process tool calls from Gemini and send back responses.
+
+        The function calls in one tool call are independent, so they run
+        concurrently; responses are sent back in the order they were requested.
+        """
+        if not function_calls:
             logging.debug("No function calls in tool_call")
             return
 
-        for fc in tool_call.function_calls:
-            try:
-                logging.debug(
-                    f"[{self.user_id}] Calling tool function: {fc.name} with args: {fc.args}"
-                )
+        responses = await asyncio.gather(
+            *(self._call_single(fc) for fc in function_calls)
+        )
+        for tool_response in responses:
+            await session.send(input=tool_response)
 
-                response = await self.mcp_client.call_tool(fc.name, fc.args)
+    async def _enqueue_tool_call(self, function_calls: list[FunctionCall]) -> None:
+        """Queue a tool call for the processor, dropping the oldest if full.
 
-                tool_response = types.LiveClientToolResponse(
-                    function_responses=[
-                        types.FunctionResponse(
-                            name=fc.name,
-                            id=fc.id,
-                            response={"response": response[0].text},
-                        )
-                    ]
-                )
-                logging.debug(f"[{self.user_id}] Tool response: {tool_response}")
-                await session.send(input=tool_response)
-            except Exception as e:
-                logging.error(
-                    f"[{self.user_id}] Error handling tool call {fc.name}: {e!s}"
-                )
-                # Send error response back to Gemini
-                error_response = types.LiveClientToolResponse(
-                    function_responses=[
-                        types.FunctionResponse(
-                            name=fc.name,
-                            id=fc.id,
-                            response={"error": f"Tool execution failed: {e!s}"},
-                        )
-                    ]
+        Gemini waits for a response to every function call, so each call in
+        the dropped tool call is answered with an error.
+        """
+        if self._tool_call_queue.full():
+            dropped = self._tool_call_queue.get_nowait()
+            self._tool_call_queue.task_done()
+            logging.warning(
+                "[%s] Tool call queue full, dropping oldest tool call", self.user_id
+            )
+            for fc in dropped:
+                await self.session.send(
+                    input=_build_tool_error(
+                        fc.name, fc.id, "Tool call dropped: too many pending calls"
+                    )
                 )
-                await session.send(input=error_response)
+        self._tool_call_queue.put_nowait(function_calls)
 
     async def _process_tool_calls(self) -> None:
-        """Continuously process tool calls from the queue."""
+        """Continuously process tool calls from the queue.
+
+        Gemini waits for each tool response before continuing, so tool calls
+        are handled one at a time by this single task.
+        """
         try:
             while self._is_running:
                 try:
-                    # Use timeout to avoid blocking indefinitely
-                    tool_call = await asyncio.wait_for(
-                        self._tool_call_queue.get(), timeout=1.0
-                    )
-                    task = asyncio.create_task(
-                        self._handle_tool_call(self.session, tool_call)
-                    )
-                    self._tool_tasks.append(task)
+                    function_calls = await self._tool_call_queue.get()
+                    await self._handle_tool_call(self.session, function_calls)
                     self._tool_call_queue.task_done()
-
-                    # Clean up completed tasks
-                    self._tool_tasks = [t for t in self._tool_tasks if not t.done()]
-
-                except asyncio.TimeoutError:
-                    # Timeout is expected, continue loop
-                    continue
                 except Exception as e:
                     logging.error(
-                        f"[{self.user_id}] Error processing tool calls: {e!s}"
+                        "[%s] Error processing tool calls: %s", self.user_id, e
                     )
         except asyncio.CancelledError:
-            logging.debug(f"[{self.user_id}] Tool call processor cancelled")
+            logging.debug("[%s] Tool call processor cancelled", self.user_id)
             raise
 
+    async def _write_to_client(self) -> None:
+        """Send queued Gemini frames to the client, coalescing bursts.
+
+        After the first frame of a batch arrives, waits WS_BATCH_MS for more
+        and sends everything queued by then as one binary message, each frame
+        prefixed with its 4-byte big-endian length, which the frontend splits
+        back apart. A batch of one frame is sent as-is. A failed send ends the
+        session, since nothing else would drain the queue.
+        """
+        try:
+            while True:
+                frames = [await self._out_queue.get()]
+                # Once stopping, flush what is queued without waiting for more
+                if self._is_running:
+                    await asyncio.sleep(WS_BATCH_MS / 1000)
+                while len(frames) < _BATCH_MAX_FRAMES and not self._out_queue.empty():
+                    frames.append(self._out_queue.get_nowait())
+                if len(frames) == 1:
+                    await self.websocket.send_bytes(frames[0])
+                else:
+                    await self.websocket.send_bytes(
+                        b"".join(len(f).to_bytes(4, "big") + f for f in frames)
+                    )
+                for _ in frames:
+                    self._out_queue.task_done()
+        except Exception as e:
+            logging.error("[%s] Error sending to client: %s", self.user_id, e)
+            self._is_running = False
+            # The Gemini reader may be blocked on the full queue
+            if self._gemini_reader_task is not None:
+                self._gemini_reader_task.cancel()
+
     async def receive_from_gemini(self) -> None:
         """Listen for and process messages from Gemini without blocking."""
         # Start the tool call processing task
         self._tool_processor_task = asyncio.create_task(self._process_tool_calls())
+        if WS_BATCH_MS:
+            self._gemini_reader_task = asyncio.current_task()
+            self._writer_task = asyncio.create_task(self._write_to_client())
 
+        # No running check per frame: connect_and_run cancels this task as
+        # soon as receive_from_client returns
         try:
-            while self._is_running and (
-                result := await self.session._ws.recv(decode=False)
-            ):
-                await self.websocket.send_bytes(result)
-                raw_message = json.loads(result)
-                if "toolCall" in raw_message:
-                    message = types.LiveServerMessage.model_validate(raw_message)
-                    tool_call = LiveServerToolCall.model_validate(message.tool_call)
+            while True:
+                result = await self.session._ws.recv(decode=False)
+                if not result:
+                    break
+                if WS_BATCH_MS:
+                    # Waits while the queue is full, pacing Gemini to the client
+                    await self._out_queue.put(result)
+                else:
+                    await self.websocket.send_bytes(result)
+                if (
+                    _SERVER_CONTENT_MARKER in result[:_FRAME_HEAD_SIZE]
+                    or _TOOL_CALL_MARKER not in result
+                ):
+                    continue
+                raw_message = orjson.loads(result)
+                tool_call = (
+                    raw_message.get("toolCall")
+                    if isinstance(raw_message, dict)
+                    else None
+                )
+                if not isinstance(tool_call, dict):
+                    continue
+                # Only the function calls are needed, so read them from the
+                # parsed dict instead of validating the whole message
+                function_calls = []
+                for entry in tool_call.get("functionCalls") or ():
+                    fc = _read_function_call(entry)
+                    if fc is not None:
+                        function_calls.append(fc)
+                        continue
+                    logging.warning(
+                        "[%s] Ignoring malformed function call: %s",
+                        self.user_id,
+                        entry,
+                    )
+                    # Gemini still waits for a response to a call it can name
+                    if isinstance(entry, dict) and entry.get("id"):
+                        await self.session.send(
+                            input=_build_tool_error(
+                                str(entry.get("name") or ""),
+                                entry["id"],
+                                "Malformed function call",
+                            )
+                        )
+                if function_calls:
                     # Add the tool call to the queue for processing
-                    await self._tool_call_queue.put(tool_call)
+                    await self._enqueue_tool_call(function_calls)
         except Exception as e:
-            logging.error(f"[{self.user_id}] Error receiving from Gemini: {e!s}")
+            logging.error("[%s] Error receiving from Gemini: %s", self.user_id, e)
         finally:
             await self.cleanup()
 
 
+# Client frames are routed by the first top-level key found in the raw text,
+# so realtime audio is forwarded without ever being parsed.
+_CLIENT_FRAME_ROUTES = (
+    ('"realtimeInput"', GeminiSession._forward_to_gemini),
+    ('"clientContent"', GeminiSession._forward_to_gemini),
+    ('"setup"', GeminiSession._handle_setup),
+)
+
+
+class PooledMCPClient:
+    """An MCP client held open by a dedicated task.
+
+    fastmcp clients must be exited from the task that entered them, so the
+    connection is owned by a background task and can be closed from any
+    connection handler or the pool sweeper.
+    """
+
+    def __init__(self, client: fastmcp.Client) -> None:
+        self.client = client
+        self.last_used = time.monotonic()
+        self._close_event = asyncio.Event()
+        self._task: asyncio.Task | None = None
+
+    @property
+    def is_open(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def open(self) -> None:
+        """Connect the client and keep it connected until close() is called."""
+        opened: asyncio.Future = asyncio.get_running_loop().create_future()
+
+        async def hold() -> None:
+            try:
+                async with self.client:
+                    opened.set_result(None)
+                    await self._close_event.wait()
+            except Exception as e:
+                if opened.done():
+                    raise
+                opened.set_exception(e)
+
+        self._task = asyncio.create_task(hold())
+        try:
+            await opened
+        except asyncio.CancelledError:
+            self._task.cancel()
+            raise
+
+    async def close(self) -> None:
+        """Disconnect the client and wait for its task to finish."""
+        if self._task is None or self._task.cancelled():
+            return
+        self._close_event.set()
+        try:
+            await self._task
+        except Exception as e:
+            logging.warning(f"Error closing MCP client: {e!s}")
+
+
+# Ordered from least to most recently released
+_MCP_POOL: dict[str, PooledMCPClient] = {}
+
+
+async def _acquire_mcp_client(user_id: str) -> PooledMCPClient:
+    """Take a warm MCP client for the user from the pool, or connect a new one.
+
+    Args:
+        user_id: The user the client's SESSION_KEY belongs to
+
+    Returns:
+        PooledMCPClient: A connected client owned by the caller until released
+    """
+    pooled = _MCP_POOL.pop(user_id, None)
+    if pooled is not None:
+        if pooled.is_open:
+            logging.info(f"Reusing pooled MCP client for user: {user_id}")
+            return pooled
+        await pooled.close()
+
+    logging.info(f"Creating MCP client for user: {user_id}")
+    pooled = PooledMCPClient(fastmcp.Client(build_user_config(user_id)))
+    await pooled.open()
+    return pooled
+
+
+async def _release_mcp_client(user_id: str, pooled: PooledMCPClient) -> None:
+    """Return a client to the pool for later reuse by the same user."""
+    if not pooled.is_open:
+        await pooled.close()
+        return
+    pooled.last_used = time.monotonic()
+    evicted = []
+    # Re-inserting moves the user to the most recently used end
+    previous = _MCP_POOL.pop(user_id, None)
+    if previous is not None:
+        # Another connection for this user already returned a client
+        evicted.append(previous)
+    _MCP_POOL[user_id] = pooled
+    while len(_MCP_POOL) > _POOL_MAX_SIZE:
+        oldest = next(iter(_MCP_POOL))
+        logging.info(f"MCP client pool full, closing client for user: {oldest}")
+        evicted.append(_MCP_POOL.pop(oldest))
+    for client in evicted:
+        await client.close()
+
+
+async def _evict_idle_mcp_clients() -> None:
+    """Periodically close pooled MCP clients that have been idle too long."""
+    while True:
+        await asyncio.sleep(_POOL_SWEEP_INTERVAL)
+        cutoff = time.monotonic() - _POOL_MAX_IDLE
+        for user_id, pooled in list(_MCP_POOL.items()):
+            if pooled.last_used < cutoff and _MCP_POOL.get(user_id) is pooled:
+                del _MCP_POOL[user_id]
+                logging.info(f"Closing idle MCP client for user: {user_id}")
+                await pooled.close()
+
+
+async def _close_mcp_pool() -> None:
+    """Close every pooled MCP client."""
+    pool = list(_MCP_POOL.values())
+    _MCP_POOL.clear()
+    await asyncio.gather(*(pooled.close() for pooled in pool))
+
+
+async def _list_tools_cached(mcp_client: fastmcp.Client) -> list:
+    """Return the MCP tool list, refreshing it at most every _TOOL_CACHE_TTL seconds.
+
+    Args:
+        mcp_client: A connected MCP client used when the cache is stale
+
+    Returns:
+        list: The tools exposed by the MCP server
+    """
+    global _tool_cache
+    now = time.monotonic()
+    if _tool_cache is not None and now - _tool_cache[0] < _TOOL_CACHE_TTL:
+        return _tool_cache[1]
+    tools = await mcp_client.list_tools()
+    _tool_cache = (now, tools)
+    return tools
+
+
 def get_connect_and_run_callable(
     websocket: WebSocket, initial_user_id: str = "anonymous"
 ) -> Callable:
@@ -267,19 +631,13 @@ def get_connect_and_run_callable(
         backoff.expo, ConnectionClosedError, max_tries=10, on_backoff=on_backoff
     )
     async def connect_and_run() -> None:
-        # Create a dedicated MCP client for this connection
-
-        # Clone the config to avoid cross-session mutation
-        user_config = copy.deepcopy(config)
-        user_config["mcpServers"]["robot"]["env"]["SESSION_KEY"] = initial_user_id
-        logging.info(f"Creating MCP client for user: {initial_user_id}")
-        mcp_client = fastmcp.Client(user_config)
         gemini_session = None
+        pooled_mcp_client = None
         try:
             if not SKIP_TIME_CHECK:
                 # Decrypt the session key to get user session details
                 logging.info(f"Decrypting session key for user: {initial_user_id}")
-                user_session = decrypt(session_key=initial_user_id)
+                user_session = await asyncio.to_thread(decrypt, initial_user_id)
 
                 if user_session is None or not user_session.get("is_valid"):
                     logging.info(
@@ -290,39 +648,50 @@ def get_connect_and_run_callable(
                 session_end = user_session.get("to", None)
             else:
                 # Skip time check, use current time for session start and end
-                session_start = datetime.now(ZoneInfo("Asia/Hong_Kong"))
+                session_start = datetime.now(_HK_TZ)
                 session_end = session_start + timedelta(days=1)
-            async with mcp_client:
-                tools = await mcp_client.list_tools()
-                live_connect_config = get_live_connect_config(
-                    tools=tools,
+            # Reuse this user's MCP client from a previous connection if any
+            pooled_mcp_client = await _acquire_mcp_client(initial_user_id)
+            mcp_client = pooled_mcp_client.client
+            tools = await _list_tools_cached(mcp_client)
+            live_connect_config = get_live_connect_config(
+                tools=tools,
+            )
+            async with genai_client.aio.live.connect(
+                model=MODEL_ID, config=live_connect_config
+            ) as session:
+                await websocket.send_json(
+                    {"status": "Backend is ready for conversation"}
                 )
-                async with genai_client.aio.live.connect(
-                    model=MODEL_ID, config=live_connect_config
-                ) as session:
-                    await websocket.send_json(
-                        {"status": "Backend is ready for conversation"}
-                    )
-                    gemini_session = GeminiSession(
-                        session=session,
-                        websocket=websocket,
-                        mcp_client=mcp_client,
-                        start_time=session_start,
-                        end_time=session_end,
-                    )
-                    # Set initial user_id
-                    gemini_session.user_id = initial_user_id
-                    logging.info("Starting bidirectional communication for new user")
-                    await asyncio.gather(
-                        gemini_session.receive_from_client(),
-                        gemini_session.receive_from_gemini(),
-                        return_exceptions=True,
-                    )
+                gemini_session = GeminiSession(
+                    session=session,
+                    websocket=websocket,
+                    mcp_client=mcp_client,
+                    start_time=session_start,
+                    end_time=session_end,
+                )
+                # Set initial user_id
+                gemini_session.user_id = initial_user_id
+                logging.info("Starting bidirectional communication for new user")
+                tasks = {
+                    asyncio.create_task(gemini_session.receive_from_client()),
+                    asyncio.create_task(gemini_session.receive_from_gemini()),
+                }
+                try:
+                    # Tear down both directions as soon as either one stops
+                    await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                finally:
+                    for task in tasks:
+                        task.cancel()
+                    await asyncio.gather(*tasks, return_exceptions=True)
         except Exception as e:
             logging.error(f"Error in connect_and_run: {e!s}")
             if gemini_session:
                 await gemini_session.cleanup()
             raise
+        finally:
+            if pooled_mcp_client is not None:
+                await _release_mcp_client(initial_user_id, pooled_mcp_client)
 
     return connect_and_run
 
@@ -362,56 +731,50 @@ def decrypt(session_key: str) -> Optional[dict]:
         encrypted_bytes = base64.b64decode(session_key)
 
         # Perform AES decryption
-        cipher = Cipher(
-            algorithms.AES(SESSION_AES_KEY),
-            modes.CBC(SESSION_AES_IV),
-            backend=default_backend(),
-        )
-        decryptor = cipher.decryptor()
-        decrypted_bytes = decryptor.update(encrypted_bytes) + decryptor.finalize()
+        decrypted_bytes = _new_session_cipher().decrypt(encrypted_bytes)
 
         # Remove padding (assuming PKCS7 padding)
-        unpadder = padding.PKCS7(algorithms.AES.block_size).unpadder()
-        decrypted_bytes = unpadder.update(decrypted_bytes) + unpadder.finalize()
+        pad = decrypted_bytes[-1]
+        if not 0 < pad <= _PKCS7_BLOCK_SIZE:
+            raise ValueError("Invalid PKCS7 padding")
+        decrypted_bytes = decrypted_bytes[:-pad]
 
-        # Decode the bytes to a string
-        decrypted_string = decrypted_bytes.decode("utf-8")
+        logging.info("Decrypted string: %s", decrypted_bytes.decode("utf-8", "replace"))
 
-        logging.info(f"Decrypted string: {decrypted_string}")
-
-        # TODO: Quick fix for trailing double quote issue
-        if decrypted_string.endswith('"'):
-            decrypted_string = decrypted_string[:-1]
         # Validate and parse JSON
         try:
-            session_object = json.loads(decrypted_string)
-        except json.JSONDecodeError as json_error:
-            logging.error(f"JSON parsing error: {json_error}")
-            return None
+            session_object = orjson.loads(decrypted_bytes)
+        except orjson.JSONDecodeError as json_error:
+            # TODO: Quick fix for trailing double quote issue
+            if decrypted_bytes[-1:] != b'"':
+                logging.error(f"JSON parsing error: {json_error}")
+                return None
+            try:
+                session_object = orjson.loads(decrypted_bytes[:-1])
+            except orjson.JSONDecodeError as json_error:
+                logging.error(f"JSON parsing error: {json_error}")
+                return None
 
         # Convert Excel serial dates to datetime and check validity
-        excel_start_date = datetime(1899, 12, 30, tzinfo=ZoneInfo("Asia/Hong_Kong"))
         decoded_datetime_to = decoded_datetime_from = None
 
         if "to" in session_object:
-            decoded_datetime_to = excel_start_date + timedelta(
-                days=session_object["to"]
-            )
+            decoded_datetime_to = _EXCEL_EPOCH + timedelta(days=session_object["to"])
             session_object["to"] = decoded_datetime_to
 
         if "from" in session_object:
-            decoded_datetime_from = excel_start_date + timedelta(
+            decoded_datetime_from = _EXCEL_EPOCH + timedelta(
                 days=session_object["from"]
             )
             session_object["from"] = decoded_datetime_from
 
-        current_time = datetime.now(ZoneInfo("Asia/Hong_Kong"))
+        current_time = datetime.now(_HK_TZ)
         session_object["is_valid"] = (
             decoded_datetime_from is not None
             and decoded_datetime_to is not None
             and decoded_datetime_from < current_time < decoded_datetime_to
         )
-        logging.info(f"Session object after decryption: {session_object}")
+        logging.info("Session object after decryption: %s", session_object)
         return session_object
 
     except Exception as e:
@@ -420,6 +783,17 @@ def decrypt(session_key: str) -> Optional[dict]:
 
 
 if __name__ == "__main__":
+    import sys
+
     import uvicorn
 
-    uvicorn.run(app, host="0.0.0.0", port=8000, log_level="debug")
+    # uvloop is not available on Windows
+    uvicorn.run(
+        app,
+        host="0.0.0.0",
+        port=8000,
+        log_level="info",
+        loop="asyncio" if sys.platform == "win32" else "uvloop",
+        http="httptools",
+        ws="websockets",
+    )
@@ -36,7 +36,7 @@ import {
   ToolResponseMessage,
   type LiveConfig,
 } from "../multimodal-live-types";
-import { blobToJSON, base64ToArrayBuffer } from "./utils";
+import { blobToJSON, base64ToArrayBuffer, splitBatchedFrames } from "./utils";
 
 /**
  * the events that this client will emit
@@ -108,9 +108,23 @@ export class MultimodalLiveClient extends EventEmitter<MultimodalLiveClientEvent
       this.runId = newRunId;
     }
 
-    ws.addEventListener("message", async (evt: MessageEvent) => {
+    // Splitting a binary message takes a varying number of async Blob reads,
+    // so chain them to hand frames to receive() in arrival order.
+    let binaryMessages: Promise<void> = Promise.resolve();
+
+    ws.addEventListener("message", (evt: MessageEvent) => {
       if (evt.data instanceof Blob) {
-        this.receive(evt.data);
+        const blob = evt.data;
+        binaryMessages = binaryMessages
+          .then(() => splitBatchedFrames(blob))
+          .then((frames) => {
+            for (const frame of frames) {
+              this.receive(frame);
+            }
+          })
+          .catch((error) => {
+            console.error("Error splitting message:", error);
+          });
       } else if (typeof evt.data === "string") {
         try {
           const jsonData = JSON.parse(evt.data);
@@ -76,6 +76,28 @@ export const blobToJSON = (blob: Blob) =>
     reader.readAsText(blob);
   });
 
+/**
+ * The backend may coalesce several Gemini frames into one binary message
+ * (see WS_BATCH_MS), each prefixed with its 4-byte big-endian length.
+ * Plain JSON frames start with "{" and are returned unchanged.
+ */
+export async function splitBatchedFrames(blob: Blob): Promise<Blob[]> {
+  const head = new Uint8Array(await blob.slice(0, 1).arrayBuffer());
+  if (head.length === 0 || head[0] === 0x7b) {
+    return [blob];
+  }
+  const view = new DataView(await blob.arrayBuffer());
+  const frames: Blob[] = [];
+  let offset = 0;
+  while (offset + 4 <= view.byteLength) {
+    const length = view.getUint32(offset);
+    offset += 4;
+    frames.push(blob.slice(offset, offset + length));
+    offset += length;
+  }
+  return frames;
+}
+
 export function base64ToArrayBuffer(base64: string) {
   var binaryString = atob(base64);
   var bytes = new Uint8Array(binaryString.length);
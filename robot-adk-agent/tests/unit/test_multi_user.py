@@ -13,10 +13,12 @@
 # limitations under the License.
 
 import asyncio
-from unittest.mock import MagicMock, patch
+from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
-from app.server import GeminiSession, app
+from app import server
+from app.config import config
+from app.server import FunctionCall, GeminiSession, app
 from fastapi.testclient import TestClient
 
 
@@ -33,6 +35,8 @@ class TestMultiUserFunctionality:
             session=session_mock,
             websocket=websocket_mock,
             mcp_client=mcp_client_mock,
+            start_time=MagicMock(),
+            end_time=MagicMock(),
         )
 
         assert gemini_session.session == session_mock
@@ -45,7 +49,7 @@ class TestMultiUserFunctionality:
 
     @pytest.mark.asyncio
     async def test_cleanup_cancels_tasks(self):
-        """Test that cleanup properly cancels all tasks."""
+        """Test that cleanup cancels the tool processor and its tool call."""
         session_mock = MagicMock()
         websocket_mock = MagicMock()
         mcp_client_mock = MagicMock()
@@ -54,18 +58,14 @@ class TestMultiUserFunctionality:
             session=session_mock,
             websocket=websocket_mock,
             mcp_client=mcp_client_mock,
+            start_time=MagicMock(),
+            end_time=MagicMock(),
         )
 
-        # Create real async tasks for testing
+        # Create a processor task stuck in a long-running tool call
         async def dummy_task():
             await asyncio.sleep(10)
 
-        task1 = asyncio.create_task(dummy_task())
-        task2 = asyncio.create_task(dummy_task())
-
-        gemini_session._tool_tasks = [task1, task2]
-
-        # Create mock processor task
         processor_task = asyncio.create_task(dummy_task())
         gemini_session._tool_processor_task = processor_task
 
@@ -73,8 +73,6 @@ class TestMultiUserFunctionality:
 
         # Verify cleanup behavior
         assert gemini_session._is_running is False
-        assert task1.cancelled()
-        assert task2.cancelled()
         assert processor_task.cancelled()
 
     @pytest.mark.asyncio
@@ -93,12 +91,16 @@ class TestMultiUserFunctionality:
             session=session1_mock,
             websocket=websocket1_mock,
             mcp_client=mcp_client1_mock,
+            start_time=MagicMock(),
+            end_time=MagicMock(),
         )
 
         gemini_session2 = GeminiSession(
             session=session2_mock,
             websocket=websocket2_mock,
             mcp_client=mcp_client2_mock,
+            start_time=MagicMock(),
+            end_time=MagicMock(),
         )
 
         # Set different user IDs
@@ -125,12 +127,16 @@ class TestMultiUserFunctionality:
             session=session1_mock,
             websocket=websocket1_mock,
             mcp_client=mcp_client1_mock,
+            start_time=MagicMock(),
+            end_time=MagicMock(),
         )
 
         gemini_session2 = GeminiSession(
             session=session2_mock,
             websocket=websocket2_mock,
             mcp_client=mcp_client2_mock,
+            start_time=MagicMock(),
+            end_time=MagicMock(),
         )
 
         # Add items to queues
@@ -148,11 +154,22 @@ class TestMultiUserFunctionality:
         assert item2 == "tool_call_2"
 
     def test_app_state_config_isolation(self):
-        """Test that app state is properly configured for per-connection MCP clients."""
+        """Test that the shared MCP config is left untouched for per-connection clients."""
         with TestClient(app):
-            # Verify that app.state.config is set up correctly
-            assert hasattr(app.state, "config")
-            assert app.state.config is not None
+            # Each connection builds its own copy with its SESSION_KEY
+            assert config["mcpServers"]["robot"]["env"]["SESSION_KEY"] == "anonymous"
+
+    def test_app_shutdown_closes_pooled_mcp_clients(self):
+        """Test that pooled per-user MCP clients are closed on app shutdown."""
+        pooled = MagicMock()
+        pooled.close = AsyncMock()
+
+        with patch.dict(server._MCP_POOL, clear=True):
+            with TestClient(app):
+                server._MCP_POOL["user1"] = pooled
+            assert not server._MCP_POOL
+
+        pooled.close.assert_awaited_once()
 
     @pytest.mark.asyncio
     async def test_error_handling_in_tool_calls(self):
@@ -175,19 +192,168 @@ class TestMultiUserFunctionality:
             session=session_mock,
             websocket=websocket_mock,
             mcp_client=mcp_client_mock,
+            start_time=MagicMock(),
+            end_time=MagicMock(),
         )
 
-        # Mock tool call with proper string values
-        function_call_mock = MagicMock()
-        function_call_mock.name = "test_tool"
-        function_call_mock.args = {}
-        function_call_mock.id = "test_id"
-
-        tool_call_mock = MagicMock()
-        tool_call_mock.function_calls = [function_call_mock]
+        function_calls = [FunctionCall(name="test_tool", id="test_id", args={})]
 
         with patch("app.server.types.LiveClientToolResponse") as mock_response:
-            await gemini_session._handle_tool_call(session_mock, tool_call_mock)
+            await gemini_session._handle_tool_call(session_mock, function_calls)
 
             # Verify error response was created
             mock_response.assert_called()
+
+    @pytest.mark.asyncio
+    async def test_tool_list_shared_across_sessions(self):
+        """Test that MCP tools are listed once and reused by later sessions."""
+        mcp_client1_mock = MagicMock()
+        mcp_client1_mock.list_tools = AsyncMock(return_value=["tool"])
+        mcp_client2_mock = MagicMock()
+        mcp_client2_mock.list_tools = AsyncMock(return_value=["other"])
+
+        with patch.object(server, "_tool_cache", None):
+            tools1 = await server._list_tools_cached(mcp_client1_mock)
+            tools2 = await server._list_tools_cached(mcp_client2_mock)
+
+        assert tools1 == tools2 == ["tool"]
+        mcp_client2_mock.list_tools.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_mcp_client_pooled_per_user(self):
+        """Test that a released MCP client is reused only by the same user."""
+        with (
+            patch("app.server.fastmcp.Client", side_effect=lambda _: AsyncMock()),
+            patch.dict(server._MCP_POOL, clear=True),
+        ):
+            pooled = await server._acquire_mcp_client("user1")
+            await server._release_mcp_client("user1", pooled)
+
+            assert await server._acquire_mcp_client("user1") is pooled
+            other = await server._acquire_mcp_client("user2")
+            assert other is not pooled
+
+            await pooled.close()
+            await other.close()
+            assert not pooled.is_open
+
+    @pytest.mark.asyncio
+    async def test_mcp_client_pool_evicts_least_recently_used(self):
+        """Test that the MCP client pool closes the oldest client beyond its cap."""
+        with (
+            patch("app.server.fastmcp.Client", side_effect=lambda _: AsyncMock()),
+            patch.dict(server._MCP_POOL, clear=True),
+            patch.object(server, "_POOL_MAX_SIZE", 2),
+        ):
+            clients = {
+                user_id: await server._acquire_mcp_client(user_id)
+                for user_id in ("user1", "user2", "user3")
+            }
+            for user_id, pooled in clients.items():
+                await server._release_mcp_client(user_id, pooled)
+
+            assert list(server._MCP_POOL) == ["user2", "user3"]
+            assert not clients["user1"].is_open
+
+            await server._close_mcp_pool()
+
+    @pytest.mark.asyncio
+    async def test_tool_call_queue_drops_oldest_when_full(self):
+        """Test that a full tool call queue drops and answers its oldest entry."""
+        session_mock = MagicMock()
+        session_mock.send = AsyncMock()
+        gemini_session = GeminiSession(
+            session=session_mock,
+            websocket=MagicMock(),
+            mcp_client=MagicMock(),
+            start_time=MagicMock(),
+            end_time=MagicMock(),
+        )
+        queue = gemini_session._tool_call_queue
+
+        for i in range(queue.maxsize + 1):
+            await gemini_session._enqueue_tool_call(
+                [FunctionCall(name="tool", id=str(i), args={})]
+            )
+
+        assert queue.qsize() == queue.maxsize
+        assert queue.get_nowait()[0].id == "1"
+        # Gemini is told that the dropped call failed
+        session_mock.send.assert_awaited_once()
+        tool_response = session_mock.send.await_args.kwargs["input"]
+        assert tool_response.function_responses[0].id == "0"
+
+    @pytest.mark.asyncio
+    async def test_cleanup_flushes_queued_frames(self):
+        """Test that cleanup sends frames still queued for the client writer."""
+        websocket_mock = MagicMock()
+        websocket_mock.send_bytes = AsyncMock()
+        gemini_session = GeminiSession(
+            session=MagicMock(),
+            websocket=websocket_mock,
+            mcp_client=MagicMock(),
+            start_time=MagicMock(),
+            end_time=MagicMock(),
+        )
+
+        with patch.object(server, "WS_BATCH_MS", 1000):
+            gemini_session._writer_task = asyncio.create_task(
+                gemini_session._write_to_client()
+            )
+            await gemini_session._out_queue.put(b"{}")
+            await gemini_session.cleanup()
+
+        websocket_mock.send_bytes.assert_awaited_once_with(b"{}")
+        assert gemini_session._writer_task.done()
+
+    @pytest.mark.asyncio
+    async def test_failed_client_send_stops_session(self):
+        """Test that a failed send to the client stops the session."""
+        websocket_mock = MagicMock()
+        websocket_mock.send_bytes = AsyncMock(side_effect=RuntimeError("closed"))
+        gemini_session = GeminiSession(
+            session=MagicMock(),
+            websocket=websocket_mock,
+            mcp_client=MagicMock(),
+            start_time=MagicMock(),
+            end_time=MagicMock(),
+        )
+
+        with patch.object(server, "WS_BATCH_MS", 0):
+            await gemini_session._out_queue.put(b"{}")
+            await gemini_session._write_to_client()
+
+        assert gemini_session._is_running is False
+
+    @pytest.mark.asyncio
+    async def test_malformed_function_call_keeps_session(self):
+        """Test that a malformed function call is answered without ending the relay."""
+        frame = (
+            b'{"toolCall": {"functionCalls": [{"id": "bad"}, null, '
+            b'{"name": "move", "id": "ok", "args": {"steps": 1}}]}}'
+        )
+        session_mock = MagicMock()
+        session_mock.send = AsyncMock()
+        session_mock._ws.recv = AsyncMock(side_effect=[frame, b""])
+        websocket_mock = MagicMock()
+        websocket_mock.send_bytes = AsyncMock()
+        gemini_session = GeminiSession(
+            session=session_mock,
+            websocket=websocket_mock,
+            mcp_client=MagicMock(),
+            start_time=MagicMock(),
+            end_time=MagicMock(),
+        )
+
+        with (
+            patch.object(server, "WS_BATCH_MS", 0),
+            patch.object(GeminiSession, "_enqueue_tool_call") as enqueue_mock,
+        ):
+            await gemini_session.receive_from_gemini()
+
+        enqueue_mock.assert_awaited_once_with(
+            [FunctionCall(name="move", id="ok", args={"steps": 1})]
+        )
+        tool_response = session_mock.send.await_args.kwargs["input"]
+        assert tool_response.function_responses[0].id == "bad"
+        assert session_mock._ws.recv.await_count == 2
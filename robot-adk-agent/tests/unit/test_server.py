@@ -12,13 +12,17 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import base64
 import json
 import logging
 import os
 from collections.abc import Generator
+from datetime import datetime
 from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
+from Crypto.Cipher import AES
+from Crypto.Util.Padding import pad
 from fastapi.testclient import TestClient
 from google.auth.credentials import Credentials
 
@@ -148,3 +152,59 @@ async def test_websocket_error_handling() -> None:
             with client.websocket_connect("/ws"):
                 pass
         assert str(exc.value) == "Connection failed"
+
+
+def _encrypt_session_key(plaintext: bytes) -> str:
+    """Encrypt a session payload the way the session key issuer does."""
+    from app.server import SESSION_AES_IV, SESSION_AES_KEY
+
+    cipher = AES.new(SESSION_AES_KEY, AES.MODE_CBC, SESSION_AES_IV)
+    return base64.b64encode(cipher.encrypt(plaintext)).decode()
+
+
+def _excel_serial_now() -> float:
+    """Return the current time as an Excel serial date."""
+    from app.server import _EXCEL_EPOCH
+
+    now = datetime.now(_EXCEL_EPOCH.tzinfo)
+    return (now - _EXCEL_EPOCH).total_seconds() / 86400
+
+
+def test_decrypt_valid_session() -> None:
+    """Test that a session key decrypts to its payload and is valid now."""
+    from app.server import decrypt
+
+    now = _excel_serial_now()
+    payload = {"user": "student", "from": now - 1, "to": now + 1}
+    session = decrypt(_encrypt_session_key(pad(json.dumps(payload).encode(), 16)))
+
+    assert session is not None
+    assert session["user"] == "student"
+    assert session["from"] < session["to"]
+    assert session["is_valid"] is True
+
+
+def test_decrypt_tolerates_trailing_quote() -> None:
+    """Test that a stray double quote after the JSON is ignored."""
+    from app.server import decrypt
+
+    plaintext = json.dumps({"user": "student"}).encode() + b'"'
+    session = decrypt(_encrypt_session_key(pad(plaintext, 16)))
+
+    assert session is not None
+    assert session["user"] == "student"
+    assert session["is_valid"] is False
+
+
+def test_decrypt_invalid_padding() -> None:
+    """Test that a payload with invalid PKCS7 padding is rejected."""
+    from app.server import decrypt
+
+    assert decrypt(_encrypt_session_key(b'{"user": "a"}\x00\x00\x00')) is None
+
+
+def test_decrypt_non_dict_payload() -> None:
+    """Test that a JSON payload that is not an object is rejected."""
+    from app.server import decrypt
+
+    assert decrypt(_encrypt_session_key(pad(b"[1, 2, 3]", 16))) is None